@@ -19,12 +19,13 @@ Desarrollada en diciembre 2025
 """
 
 import streamlit as st
-import pandas as pd
-import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import io
 from datetime import datetime
+from calculos import (
+    actualizar_tabla_amortizacion, calcular_metricas, calcular_meses_ahorrados,
+    crear_excel_descargable
+)
 
 # Configuración de la página
 st.set_page_config(
@@ -118,200 +119,7 @@ with st.expander("📋 Información del Proyecto", expanded=True):
     **Desarrollado en:** Diciembre 2025
     """)
 
-def calcular_pago_mensual(prestamo, tasa_interes_anual, plazo_meses):
-    """
-    Calcula el pago mensual usando el sistema francés de amortización
-    """
-    if plazo_meses <= 0:
-        return 0.0
-    
-    tasa_mensual = tasa_interes_anual / 12 / 100
-    if tasa_mensual > 0 and plazo_meses > 0:
-        try:
-            pago_base = prestamo * (tasa_mensual * (1 + tasa_mensual)**plazo_meses) / ((1 + tasa_mensual)**plazo_meses - 1)
-            return pago_base
-        except:
-            return prestamo / plazo_meses
-    else:
-        return prestamo / plazo_meses if plazo_meses > 0 else prestamo
-
-def generar_tabla_amortizacion(precio_compra, enganche, tasa_interes_anual, plazo_meses, 
-                              aportacion_extra=0, inicio_aportacion=1, tipo_amortizacion="Francesa",
-                              tipo_aportacion="Mensual hasta el final", meses_aportacion=None):
-    """
-    Genera la tabla de amortización completa con aportaciones opcionales
-    """
-    # Validaciones iniciales
-    if plazo_meses <= 0:
-        return pd.DataFrame(), 0
-    
-    prestamo = max(0.0, precio_compra - enganche)
-    if prestamo <= 0:
-        return pd.DataFrame(), 0
-    
-    tasa_mensual = tasa_interes_anual / 12 / 100
-    
-    # Calcular pago mensual según el tipo de amortización
-    if tipo_amortizacion == "Francesa":
-        pago_mensual = calcular_pago_mensual(prestamo, tasa_interes_anual, plazo_meses)
-    else:  # Sistema Alemán
-        pago_capital = prestamo / plazo_meses if plazo_meses > 0 else prestamo
-        pago_mensual = pago_capital + (prestamo * tasa_mensual)
-    
-    # Determinar meses de aportación de forma segura
-    inicio_aportacion = max(1, min(inicio_aportacion, plazo_meses))
-    
-    if meses_aportacion is None:
-        if tipo_aportacion == "Única":
-            meses_aportacion = 1
-        elif tipo_aportacion == "Mensual hasta el final":
-            meses_aportacion = max(1, plazo_meses - inicio_aportacion + 1)
-    
-    # Limitar meses_aportacion a un valor razonable
-    meses_aportacion = max(1, min(meses_aportacion, plazo_meses - inicio_aportacion + 1))
-    
-    # Inicializar listas para la tabla
-    datos = []
-    saldo = prestamo
-    
-    for mes in range(1, plazo_meses + 1):
-        # Calcular interés del periodo
-        interes_mes = saldo * tasa_mensual
-        
-        # Sistema Alemán
-        if tipo_amortizacion == "Alemana":
-            amortizacion = prestamo / plazo_meses if plazo_meses > 0 else 0
-            pago_total = amortizacion + interes_mes
-        else:  # Sistema Francés
-            amortizacion = max(0, pago_mensual - interes_mes)
-            pago_total = pago_mensual
-        
-        # Agregar aportación extra si aplica
-        aportacion_este_mes = 0.0
-        if aportacion_extra > 0 and mes >= inicio_aportacion:
-            # Verificar tipo de aportación
-            if tipo_aportacion == "Única":
-                if mes == inicio_aportacion:
-                    aportacion_este_mes = aportacion_extra
-            elif tipo_aportacion == "Por número limitado de meses":
-                if mes < inicio_aportacion + meses_aportacion:
-                    aportacion_este_mes = aportacion_extra
-            else:  # "Mensual hasta el final"
-                aportacion_este_mes = aportacion_extra
-        
-        if aportacion_este_mes > 0:
-            pago_total += aportacion_este_mes
-            amortizacion += aportacion_este_mes
-        
-        # Asegurar que no haya saldo negativo
-        if amortizacion > saldo:
-            amortizacion = saldo
-            pago_total = interes_mes + amortizacion
-        
-        # Actualizar saldo
-        saldo_anterior = saldo
-        saldo = max(0.0, saldo - amortizacion)
-        
-        # Agregar fila a los datos
-        datos.append({
-            'Mes': mes,
-            'Saldo Inicial': saldo_anterior,
-            'Pago Total': pago_total,
-            'Interés': interes_mes,
-            'Amortización': amortizacion,
-            'Aportación Extra': aportacion_este_mes,
-            'Saldo Final': saldo
-        })
-        
-        if saldo <= 0:
-            break
-    
-    df = pd.DataFrame(datos)
-    return df, prestamo
-
-def calcular_ahorro_interes(df, tasa_interes):
-    """
-    Calcula el ahorro en intereses por aportaciones extra
-    """
-    if 'Aportación Extra' not in df.columns or df.empty:
-        return 0.0
-    
-    total_aportaciones = df['Aportación Extra'].sum()
-    if total_aportaciones > 0:
-        tasa_mensual = tasa_interes / 12 / 100
-        return total_aportaciones * tasa_mensual * 0.5
-    return 0.0
-
-def calcular_meses_ahorrados(df, plazo_original):
-    """
-    Calcula cuántos meses se ahorraron por las aportaciones
-    """
-    if df.empty:
-        return 0
-    plazo_real = len(df)
-    return max(0, plazo_original - plazo_real)
-
-def crear_excel_descargable(df, resumen, tipo_aportacion="No aplica", tasa_interes=0, plazo_original=0):
-    """
-    Crea un archivo Excel descargable con formato profesional
-    """
-    output = io.BytesIO()
-    
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # Hoja 1: Tabla de amortización
-        df.to_excel(writer, sheet_name='Amortización', index=False)
-        
-        # Hoja 2: Resumen
-        resumen_df = pd.DataFrame(list(resumen.items()), columns=['Concepto', 'Valor'])
-        resumen_df.to_excel(writer, sheet_name='Resumen', index=False)
-        
-        # Hoja 3: Análisis (si hay aportaciones y datos)
-        if not df.empty and 'Aportación Extra' in df.columns and df['Aportación Extra'].sum() > 0:
-            ahorro_interes = calcular_ahorro_interes(df, tasa_interes)
-            meses_ahorrados = calcular_meses_ahorrados(df, plazo_original)
-            
-            analisis_df = pd.DataFrame({
-                'Métrica': [
-                    'Total Aportaciones Extra',
-                    'Meses con aportación extra',
-                    'Interés ahorrado estimado',
-                    'Plazo reducido',
-                    'Pago mensual promedio con aportaciones',
-                    'Pago mensual promedio sin aportaciones estimado'
-                ],
-                'Valor': [
-                    f"${df['Aportación Extra'].sum():,.2f}",
-                    f"{len(df[df['Aportación Extra'] > 0])} meses",
-                    f"${ahorro_interes:,.2f}",
-                    f"{meses_ahorrados} meses",
-                    f"${df['Pago Total'].mean():,.2f}",
-                    f"${(df['Pago Total'].sum() - df['Aportación Extra'].sum()) / len(df):,.2f}" if len(df) > 0 else "$0.00"
-                ]
-            })
-            analisis_df.to_excel(writer, sheet_name='Impacto Aportaciones', index=False)
-        
-        # Formatear hojas
-        if not df.empty:
-            worksheet1 = writer.sheets['Amortización']
-            for col in range(1, len(df.columns) + 1):
-                column_letter = chr(64 + col)
-                column = df.columns[col-1]
-                
-                # Encontrar ancho máximo
-                max_length = max(len(str(column)), df.iloc[:, col-1].astype(str).map(len).max())
-                adjusted_width = min(max_length + 2, 30)
-                worksheet1.column_dimensions[column_letter].width = adjusted_width
-                
-                # Formato de moneda para columnas numéricas (excepto Mes)
-                if col > 1:
-                    for row in range(2, len(df) + 2):
-                        cell = worksheet1.cell(row=row, column=col)
-                        cell.number_format = '$#,##0.00'
-    
-    output.seek(0)
-    return output
-
-def crear_graficos(df, prestamo, tasa_anual):
+def crear_graficos(df, prestamo, tasa_anual, metricas=None):
     """
     Crea gráficos interactivos para visualización
     """
@@ -337,8 +145,12 @@ def crear_graficos(df, prestamo, tasa_anual):
     )
     
     # Gráfico 2: Distribución total de pagos
-    total_interes = df['Interés'].sum()
-    total_capital = df['Amortización'].sum()
+    if metricas is not None:
+        total_interes = metricas['total_interes']
+        total_capital = metricas['total_capital']
+    else:
+        total_interes = df['Interés'].sum()
+        total_capital = df['Amortización'].sum()
     if total_interes + total_capital > 0:
         fig.add_trace(
             go.Pie(labels=['Interés', 'Capital'], values=[total_interes, total_capital],
@@ -363,9 +175,11 @@ def crear_graficos(df, prestamo, tasa_anual):
             row=2, col=1
         )
     
-    # Gráfico 4: Pagos acumulados
-    df['Interés Acumulado'] = df['Interés'].cumsum()
-    df['Capital Acumulado'] = df['Amortización'].cumsum()
+    # Gráfico 4: Pagos acumulados (la tabla compacta ya los trae calculados)
+    if 'Interés Acumulado' not in df.columns:
+        df['Interés Acumulado'] = df['Interés'].cumsum()
+    if 'Capital Acumulado' not in df.columns:
+        df['Capital Acumulado'] = df['Amortización'].cumsum()
     fig.add_trace(
         go.Scatter(x=df['Mes'], y=df['Interés Acumulado'], 
                   name='Interés Total', line=dict(color='#FF6B6B', width=3),
@@ -544,8 +358,25 @@ if aportaciones_check:
         )
         meses_aportacion = max(1, plazo_meses - inicio_aportacion + 1)
 
-# Botón para calcular
+# Parámetros actuales del crédito
+parametros_tabla = {
+    'precio_compra': precio_compra,
+    'enganche': enganche,
+    'tasa_interes_anual': tasa_interes,
+    'plazo_meses': plazo_meses,
+    'aportacion_extra': aportacion_extra,
+    'inicio_aportacion': inicio_aportacion,
+    'tipo_amortizacion': tipo_amortizacion,
+    'tipo_aportacion': tipo_aportacion,
+    'meses_aportacion': meses_aportacion
+}
+
+# Botón para calcular. Después del primer cálculo la tabla se actualiza
+# automáticamente al modificar los datos del panel lateral
 if st.sidebar.button("🚀 Calcular Tabla de Amortización", type="primary", use_container_width=True):
+    st.session_state['calculo_activo'] = True
+
+if st.session_state.get('calculo_activo', False):
     # Validación final antes de calcular
     if prestamo_calculado <= 0:
         st.error("""
@@ -562,23 +393,27 @@ if st.sidebar.button("🚀 Calcular Tabla de Amortización", type="primary", use
         st.error("El número de plazos debe ser mayor a 0.")
     else:
         with st.spinner("Generando tabla de amortización..."):
-            # Generar tabla
-            df_tabla, prestamo = generar_tabla_amortizacion(
-                precio_compra, enganche, tasa_interes, plazo_meses,
-                aportacion_extra, inicio_aportacion, tipo_amortizacion,
-                tipo_aportacion, meses_aportacion
+            # Generar tabla reutilizando los meses que no cambiaron desde el cálculo anterior
+            tabla, prestamo = actualizar_tabla_amortizacion(
+                st.session_state.get('tabla_amortizacion'),
+                st.session_state.get('parametros_tabla'),
+                parametros_tabla
             )
+            st.session_state['tabla_amortizacion'] = tabla
+            st.session_state['parametros_tabla'] = parametros_tabla
+            metricas = calcular_metricas(tabla)
+            df_tabla = tabla.a_dataframe(acumulados=True)
             
-            if df_tabla.empty:
+            if tabla.empty:
                 st.warning("No se pudo generar la tabla de amortización. Verifica los datos ingresados.")
             else:
                 # Calcular métricas importantes
-                total_interes = df_tabla['Interés'].sum()
-                total_pagado = df_tabla['Pago Total'].sum()
-                total_aportaciones = df_tabla['Aportación Extra'].sum() if 'Aportación Extra' in df_tabla.columns else 0
-                pago_promedio = df_tabla['Pago Total'].mean()
-                plazo_real = len(df_tabla)
-                meses_ahorrados = calcular_meses_ahorrados(df_tabla, plazo_meses)
+                total_interes = metricas['total_interes']
+                total_pagado = metricas['total_pagado']
+                total_aportaciones = metricas['total_aportaciones']
+                pago_promedio = metricas['pago_promedio']
+                plazo_real = metricas['plazo_real']
+                meses_ahorrados = calcular_meses_ahorrados(tabla, plazo_meses)
                 
                 # Mostrar resumen
                 st.markdown('<p class="sub-header">📈 Resumen del Crédito</p>', unsafe_allow_html=True)
@@ -623,7 +458,7 @@ if st.sidebar.button("🚀 Calcular Tabla de Amortización", type="primary", use
                 
                 # Crear gráficos
                 st.markdown('<p class="sub-header">📊 Visualizaciones</p>', unsafe_allow_html=True)
-                fig = crear_graficos(df_tabla, prestamo, tasa_interes)
+                fig = crear_graficos(df_tabla, prestamo, tasa_interes, metricas)
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Preparar datos para Excel
@@ -641,7 +476,7 @@ if st.sidebar.button("🚀 Calcular Tabla de Amortización", type="primary", use
                     'Inicio Aportación': f"Mes {inicio_aportacion}" if aportaciones_check else "No aplica",
                     'Meses de Aportación': f"{meses_aportacion} meses" if aportaciones_check else "No aplica",
                     'Total Intereses': f"${total_interes:,.2f}",
-                    'Total Capital': f"${df_tabla['Amortización'].sum():,.2f}",
+                    'Total Capital': f"${metricas['total_capital']:,.2f}",
                     'Total Aportaciones': f"${total_aportaciones:,.2f}",
                     'Total a Pagar': f"${total_pagado:,.2f}",
                     'Pago Promedio Mensual': f"${pago_promedio:,.2f}",
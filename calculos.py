@@ -0,0 +1,510 @@
+"""
+Cálculos de las tablas de amortización, independientes de la interfaz.
+Los utilizan la aplicación de Streamlit (amortizacion.py) y el servicio HTTP (servidor.py).
+"""
+
+import pandas as pd
+import numpy as np
+import io
+
+def calcular_pago_mensual(prestamo, tasa_interes_anual, plazo_meses):
+    """
+    Calcula el pago mensual usando el sistema francés de amortización
+    """
+    if plazo_meses <= 0:
+        return 0.0
+    
+    tasa_mensual = tasa_interes_anual / 12 / 100
+    if tasa_mensual > 0 and plazo_meses > 0:
+        try:
+            pago_base = prestamo * (tasa_mensual * (1 + tasa_mensual)**plazo_meses) / ((1 + tasa_mensual)**plazo_meses - 1)
+            return pago_base
+        except:
+            return prestamo / plazo_meses
+    else:
+        return prestamo / plazo_meses if plazo_meses > 0 else prestamo
+
+# Columnas base de la tabla de amortización
+COLUMNAS_TABLA = ['Mes', 'Saldo Inicial', 'Pago Total', 'Interés', 'Amortización',
+                  'Aportación Extra', 'Saldo Final']
+
+# Parámetros que sólo afectan a las aportaciones extra
+CLAVES_APORTACION = ('aportacion_extra', 'inicio_aportacion', 'tipo_aportacion', 'meses_aportacion')
+
+def normalizar_aportacion(plazo_meses, inicio_aportacion, tipo_aportacion, meses_aportacion):
+    """
+    Ajusta el mes de inicio y el número de meses de aportación a valores válidos
+    """
+    inicio_aportacion = max(1, min(inicio_aportacion, plazo_meses))
+    
+    if meses_aportacion is None:
+        if tipo_aportacion == "Única":
+            meses_aportacion = 1
+        elif tipo_aportacion == "Mensual hasta el final":
+            meses_aportacion = max(1, plazo_meses - inicio_aportacion + 1)
+    
+    # Limitar meses_aportacion a un valor razonable
+    meses_aportacion = max(1, min(meses_aportacion, plazo_meses - inicio_aportacion + 1))
+    return inicio_aportacion, meses_aportacion
+
+def calcular_aportacion_mes(mes, aportacion_extra, inicio_aportacion, tipo_aportacion, meses_aportacion):
+    """
+    Devuelve la aportación extra que corresponde a un mes determinado
+    """
+    if aportacion_extra <= 0 or mes < inicio_aportacion:
+        return 0.0
+    
+    if tipo_aportacion == "Única":
+        return aportacion_extra if mes == inicio_aportacion else 0.0
+    elif tipo_aportacion == "Por número limitado de meses":
+        return aportacion_extra if mes < inicio_aportacion + meses_aportacion else 0.0
+    else:  # "Mensual hasta el final"
+        return aportacion_extra
+
+# Columnas de montos de la tabla (todas salvo 'Mes')
+COLUMNAS_MONTO = COLUMNAS_TABLA[1:]
+
+# Totales que se precalculan al generar la tabla y columna de la que provienen
+COLUMNAS_TOTALES = {
+    'total_interes': 'Interés',
+    'total_pagado': 'Pago Total',
+    'total_capital': 'Amortización',
+    'total_aportaciones': 'Aportación Extra'
+}
+
+# Columnas acumuladas que puede incluir la vista como DataFrame y total del que provienen
+COLUMNAS_ACUMULADAS = {
+    'Interés Acumulado': 'total_interes',
+    'Capital Acumulado': 'total_capital'
+}
+
+# Tipos de almacenamiento para los montos de TablaAmortizacion
+TIPOS_ALMACENAMIENTO = {
+    'float64': np.float64,
+    'float32': np.float32,
+    'centavos': np.int32
+}
+
+def tipo_montos(tipo_almacenamiento, monto_maximo=None):
+    """
+    Devuelve el dtype de los montos. Con 'centavos' se usa int32 si el monto
+    máximo cabe (hasta $21,474,836.47) y int64 en otro caso o si no se conoce
+    """
+    if tipo_almacenamiento == 'centavos':
+        if monto_maximo is None or round(monto_maximo * 100) > np.iinfo(np.int32).max:
+            return np.dtype(np.int64)
+    return np.dtype(TIPOS_ALMACENAMIENTO[tipo_almacenamiento])
+
+class TablaAmortizacion:
+    """
+    Tabla de amortización almacenada por columnas en arreglos de NumPy.
+    Sólo los primeros `meses` renglones son válidos; la columna 'Mes' no se
+    guarda, se genera al pedirla.
+
+    Los montos se guardan como float64, float32 o como enteros en centavos
+    ('centavos', en int32 salvo montos muy grandes; ver tipo_montos). Los
+    cálculos se hacen siempre en float64; el tipo de almacenamiento sólo
+    afecta a los valores guardados. Al terminar, los
+    arreglos se recortan a los meses válidos y sólo se conservan los totales
+    finales.
+
+    Con incremental=True los arreglos se mantienen para el plazo completo y
+    se guardan además, en float64, el saldo final y los totales acumulados de
+    cada mes, para poder reanudar el cálculo desde cualquier mes con el mismo
+    resultado que un cálculo completo
+    """
+
+    def __init__(self, plazo_meses, tipo_almacenamiento='float64', incremental=False, monto_maximo=None):
+        if tipo_almacenamiento not in TIPOS_ALMACENAMIENTO:
+            raise ValueError(f"Tipo de almacenamiento no válido: {tipo_almacenamiento}. "
+                             f"Opciones: {', '.join(TIPOS_ALMACENAMIENTO)}")
+        self.plazo_meses = max(0, plazo_meses)
+        self.tipo_almacenamiento = tipo_almacenamiento
+        self.incremental = incremental
+        self.meses = 0
+        self.totales = {clave: 0.0 for clave in COLUMNAS_TOTALES}
+        # Un renglón por columna: cada columna ocupa un bloque contiguo de memoria
+        self.montos = np.zeros((len(COLUMNAS_MONTO), self.plazo_meses),
+                               dtype=tipo_montos(tipo_almacenamiento, monto_maximo))
+        self.acumulados = self.saldo = None
+        if incremental:
+            # Totales acumulados al cierre de cada mes, en el orden de COLUMNAS_TOTALES
+            self.acumulados = np.zeros((len(COLUMNAS_TOTALES), self.plazo_meses), dtype=np.float64)
+            # Saldo final exacto; con float64 es la misma columna 'Saldo Final'
+            if tipo_almacenamiento == 'float64':
+                self.saldo = self.montos[COLUMNAS_MONTO.index('Saldo Final')]
+            else:
+                self.saldo = np.zeros(self.plazo_meses, dtype=np.float64)
+
+    def __len__(self):
+        return self.meses
+
+    def __getitem__(self, nombre):
+        return self.columna(nombre)
+
+    @property
+    def empty(self):
+        return self.meses == 0
+
+    @property
+    def columns(self):
+        return list(COLUMNAS_TABLA)
+
+    @property
+    def mes_liquidacion(self):
+        """
+        Mes en que se liquida el crédito (None si la tabla está vacía)
+        """
+        return self.meses if self.meses > 0 else None
+
+    @property
+    def nbytes(self):
+        """
+        Memoria ocupada por los arreglos de la tabla, en bytes
+        """
+        nbytes = self.montos.nbytes
+        if self.incremental:
+            nbytes += self.acumulados.nbytes
+            if not np.shares_memory(self.saldo, self.montos):
+                nbytes += self.saldo.nbytes
+        return nbytes
+
+    def registrar(self, indice, valores, acumulados):
+        """
+        Guarda los montos de un mes (en el orden de COLUMNAS_MONTO) en el
+        renglón indicado (base 0). Los totales acumulados a su cierre (en el
+        orden de COLUMNAS_TOTALES) sólo se guardan en tablas incrementales
+        """
+        if self.incremental:
+            self.saldo[indice] = valores[-1]
+            self.acumulados[:, indice] = acumulados
+        if self.tipo_almacenamiento == 'centavos':
+            valores = [round(valor * 100) for valor in valores]
+        self.montos[:, indice] = valores
+
+    def finalizar(self, meses, totales):
+        """
+        Fija el número de meses válidos y los totales del crédito (en el orden
+        de COLUMNAS_TOTALES). Si la tabla no es incremental, recorta los montos
+        a los meses válidos
+        """
+        self.meses = meses
+        self.totales = {clave: float(valor) for clave, valor in zip(COLUMNAS_TOTALES, totales)}
+        if not self.incremental and meses < self.montos.shape[1]:
+            self.montos = np.ascontiguousarray(self.montos[:, :meses])
+
+    def columna(self, nombre):
+        """
+        Devuelve los valores válidos de una columna. Con almacenamiento en
+        float64 o float32 es una vista sin copia; con 'centavos' se convierte
+        a pesos en un arreglo nuevo
+        """
+        if nombre == 'Mes':
+            return np.arange(1, self.meses + 1, dtype=np.int64)
+        if nombre in COLUMNAS_ACUMULADAS:
+            return self.acumulado(COLUMNAS_ACUMULADAS[nombre])
+        valores = self.montos[COLUMNAS_MONTO.index(nombre), :self.meses]
+        if self.tipo_almacenamiento == 'centavos':
+            return valores / 100
+        return valores
+
+    def acumulado(self, clave):
+        """
+        Devuelve el total acumulado mes a mes (clave de COLUMNAS_TOTALES).
+        En tablas incrementales es una vista; en las demás se calcula al pedirlo
+        """
+        if self.incremental:
+            return self.acumulados[list(COLUMNAS_TOTALES).index(clave), :self.meses]
+        return np.cumsum(self.columna(COLUMNAS_TOTALES[clave]), dtype=np.float64)
+
+    def metricas(self):
+        """
+        Devuelve los totales precalculados del crédito
+        """
+        metricas = dict(self.totales)
+        metricas['plazo_real'] = self.meses
+        metricas['pago_promedio'] = metricas['total_pagado'] / self.meses if self.meses > 0 else 0.0
+        return metricas
+
+    def a_dataframe(self, acumulados=False):
+        """
+        Devuelve la tabla como DataFrame de pandas construido sobre las columnas
+        (sin copia salvo con almacenamiento en 'centavos'). Con acumulados=True
+        incluye también 'Interés Acumulado' y 'Capital Acumulado'
+        """
+        nombres = COLUMNAS_TABLA + list(COLUMNAS_ACUMULADAS) if acumulados else COLUMNAS_TABLA
+        return pd.DataFrame({nombre: self.columna(nombre) for nombre in nombres}, copy=False)
+
+    def a_arrow(self):
+        """
+        Devuelve la tabla como pyarrow.Table construida sobre las columnas
+        (sin copia salvo con almacenamiento en 'centavos'). Requiere pyarrow
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("TablaAmortizacion.a_arrow requiere pyarrow: pip install pyarrow") from None
+        return pa.table({nombre: self.columna(nombre) for nombre in COLUMNAS_TABLA})
+
+def generar_tabla_compacta(precio_compra, enganche, tasa_interes_anual, plazo_meses, 
+                           aportacion_extra=0, inicio_aportacion=1, tipo_amortizacion="Francesa",
+                           tipo_aportacion="Mensual hasta el final", meses_aportacion=None,
+                           tipo_almacenamiento='float64', incremental=False,
+                           tabla_previa=None, mes_reinicio=1):
+    """
+    Genera la tabla de amortización como TablaAmortizacion.
+    Con incremental=True la tabla guarda lo necesario para reanudarla. Si se
+    indica una tabla previa incremental del mismo crédito, se reutilizan sus
+    arreglos: los meses anteriores a mes_reinicio se conservan sin copiarse y
+    sólo se sobrescriben los siguientes (las vistas previas de la tabla
+    reflejan el cambio)
+    """
+    # Validaciones iniciales
+    if plazo_meses <= 0:
+        return TablaAmortizacion(0, tipo_almacenamiento, incremental), 0
+    
+    prestamo = max(0.0, precio_compra - enganche)
+    if prestamo <= 0:
+        return TablaAmortizacion(0, tipo_almacenamiento, incremental), 0
+    
+    tasa_mensual = tasa_interes_anual / 12 / 100
+    
+    # Calcular pago mensual según el tipo de amortización
+    if tipo_amortizacion == "Francesa":
+        pago_mensual = calcular_pago_mensual(prestamo, tasa_interes_anual, plazo_meses)
+    else:  # Sistema Alemán
+        pago_capital = prestamo / plazo_meses if plazo_meses > 0 else prestamo
+        pago_mensual = pago_capital + (prestamo * tasa_mensual)
+    
+    # Cota de cualquier monto de la tabla, para elegir el tipo de los centavos
+    monto_maximo = prestamo * (1 + tasa_mensual) + pago_mensual + max(0.0, aportacion_extra)
+    
+    # Determinar meses de aportación de forma segura
+    inicio_aportacion, meses_aportacion = normalizar_aportacion(
+        plazo_meses, inicio_aportacion, tipo_aportacion, meses_aportacion
+    )
+    
+    # Reanudar desde la tabla previa cuando el cambio no afecta a los primeros meses
+    if (tabla_previa is not None and tabla_previa.incremental
+            and tabla_previa.plazo_meses == plazo_meses
+            and tabla_previa.montos.dtype == tipo_montos(tipo_almacenamiento, monto_maximo)
+            and 1 < mes_reinicio <= len(tabla_previa)):
+        # El saldo y los totales del mes anterior se guardan en float64: no se
+        # vuelve a sumar el prefijo y el resultado es idéntico a un cálculo completo
+        tabla = tabla_previa
+        saldo = float(tabla.saldo[mes_reinicio - 2])
+        total_interes, total_pagado, total_capital, total_aportaciones = (
+            float(valor) for valor in tabla.acumulados[:, mes_reinicio - 2]
+        )
+    else:
+        tabla = TablaAmortizacion(plazo_meses, tipo_almacenamiento, incremental, monto_maximo)
+        mes_reinicio = 1
+        saldo = prestamo
+        total_interes = total_pagado = total_capital = total_aportaciones = 0.0
+    
+    ultimo_mes = mes_reinicio - 1
+    
+    for mes in range(mes_reinicio, plazo_meses + 1):
+        # Calcular interés del periodo
+        interes_mes = saldo * tasa_mensual
+        
+        # Sistema Alemán
+        if tipo_amortizacion == "Alemana":
+            amortizacion = prestamo / plazo_meses if plazo_meses > 0 else 0
+            pago_total = amortizacion + interes_mes
+        else:  # Sistema Francés
+            amortizacion = max(0, pago_mensual - interes_mes)
+            pago_total = pago_mensual
+        
+        # Agregar aportación extra si aplica
+        aportacion_este_mes = calcular_aportacion_mes(
+            mes, aportacion_extra, inicio_aportacion, tipo_aportacion, meses_aportacion
+        )
+        
+        if aportacion_este_mes > 0:
+            pago_total += aportacion_este_mes
+            amortizacion += aportacion_este_mes
+        
+        # Asegurar que no haya saldo negativo
+        if amortizacion > saldo:
+            amortizacion = saldo
+            pago_total = interes_mes + amortizacion
+        
+        # Actualizar saldo
+        saldo_anterior = saldo
+        saldo = max(0.0, saldo - amortizacion)
+        
+        total_interes += interes_mes
+        total_pagado += pago_total
+        total_capital += amortizacion
+        total_aportaciones += aportacion_este_mes
+        
+        # Guardar el renglón en el orden de COLUMNAS_MONTO y COLUMNAS_TOTALES
+        tabla.registrar(mes - 1, (saldo_anterior, pago_total, interes_mes, amortizacion,
+                                  aportacion_este_mes, saldo),
+                        (total_interes, total_pagado, total_capital, total_aportaciones))
+        ultimo_mes = mes
+        
+        if saldo <= 0:
+            break
+    
+    tabla.finalizar(ultimo_mes, (total_interes, total_pagado, total_capital, total_aportaciones))
+    return tabla, prestamo
+
+def generar_tabla_amortizacion(precio_compra, enganche, tasa_interes_anual, plazo_meses, 
+                              aportacion_extra=0, inicio_aportacion=1, tipo_amortizacion="Francesa",
+                              tipo_aportacion="Mensual hasta el final", meses_aportacion=None):
+    """
+    Genera la tabla de amortización completa con aportaciones opcionales
+    """
+    tabla, prestamo = generar_tabla_compacta(
+        precio_compra, enganche, tasa_interes_anual, plazo_meses,
+        aportacion_extra, inicio_aportacion, tipo_amortizacion,
+        tipo_aportacion, meses_aportacion
+    )
+    if tabla.empty:
+        return pd.DataFrame(), prestamo
+    return tabla.a_dataframe(), prestamo
+
+def primer_mes_modificado(parametros_previos, parametros_nuevos):
+    """
+    Determina el primer mes en que difieren dos configuraciones del crédito.
+    Devuelve 1 si cambió algún dato distinto de las aportaciones y plazo + 1
+    si ningún mes se ve afectado
+    """
+    base_previa = {k: v for k, v in parametros_previos.items() if k not in CLAVES_APORTACION}
+    base_nueva = {k: v for k, v in parametros_nuevos.items() if k not in CLAVES_APORTACION}
+    plazo_meses = parametros_nuevos['plazo_meses']
+    if base_previa != base_nueva or plazo_meses <= 0:
+        return 1
+    
+    aportaciones = []
+    for parametros in (parametros_previos, parametros_nuevos):
+        inicio, meses = normalizar_aportacion(
+            plazo_meses, parametros['inicio_aportacion'],
+            parametros['tipo_aportacion'], parametros['meses_aportacion']
+        )
+        aportaciones.append((parametros['aportacion_extra'], inicio, parametros['tipo_aportacion'], meses))
+    
+    for mes in range(1, plazo_meses + 1):
+        if calcular_aportacion_mes(mes, *aportaciones[0]) != calcular_aportacion_mes(mes, *aportaciones[1]):
+            return mes
+    return plazo_meses + 1
+
+def actualizar_tabla_amortizacion(tabla_previa, parametros_previos, parametros_nuevos):
+    """
+    Recalcula una TablaAmortizacion reutilizando en su lugar los meses de la
+    tabla previa que no cambian. Devuelve la tabla y el préstamo
+    """
+    if tabla_previa is None or tabla_previa.empty or parametros_previos is None:
+        return generar_tabla_compacta(**parametros_nuevos, incremental=True)
+    
+    mes_reinicio = primer_mes_modificado(parametros_previos, parametros_nuevos)
+    if mes_reinicio > len(tabla_previa):
+        # El cambio ocurre después de liquidar el crédito: la tabla no cambia
+        prestamo = max(0.0, parametros_nuevos['precio_compra'] - parametros_nuevos['enganche'])
+        return tabla_previa, prestamo
+    
+    return generar_tabla_compacta(
+        **parametros_nuevos, tipo_almacenamiento=tabla_previa.tipo_almacenamiento,
+        incremental=True, tabla_previa=tabla_previa, mes_reinicio=mes_reinicio
+    )
+
+def calcular_metricas(df):
+    """
+    Calcula los totales del crédito. Para una TablaAmortizacion se usan los
+    totales precalculados al generarla
+    """
+    if isinstance(df, TablaAmortizacion):
+        return df.metricas()
+    
+    if df.empty:
+        metricas = {clave: 0.0 for clave in COLUMNAS_TOTALES}
+    else:
+        metricas = {clave: df[columna].sum() for clave, columna in COLUMNAS_TOTALES.items()}
+    
+    metricas['plazo_real'] = len(df)
+    metricas['pago_promedio'] = metricas['total_pagado'] / len(df) if len(df) > 0 else 0.0
+    return metricas
+
+def calcular_ahorro_interes(df, tasa_interes):
+    """
+    Calcula el ahorro en intereses por aportaciones extra
+    """
+    if 'Aportación Extra' not in df.columns or df.empty:
+        return 0.0
+    
+    total_aportaciones = df['Aportación Extra'].sum()
+    if total_aportaciones > 0:
+        tasa_mensual = tasa_interes / 12 / 100
+        return total_aportaciones * tasa_mensual * 0.5
+    return 0.0
+
+def calcular_meses_ahorrados(df, plazo_original):
+    """
+    Calcula cuántos meses se ahorraron por las aportaciones
+    """
+    if df.empty:
+        return 0
+    plazo_real = len(df)
+    return max(0, plazo_original - plazo_real)
+
+def crear_excel_descargable(df, resumen, tipo_aportacion="No aplica", tasa_interes=0, plazo_original=0):
+    """
+    Crea un archivo Excel descargable con formato profesional
+    """
+    output = io.BytesIO()
+    
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # Hoja 1: Tabla de amortización
+        df.to_excel(writer, sheet_name='Amortización', index=False)
+        
+        # Hoja 2: Resumen
+        resumen_df = pd.DataFrame(list(resumen.items()), columns=['Concepto', 'Valor'])
+        resumen_df.to_excel(writer, sheet_name='Resumen', index=False)
+        
+        # Hoja 3: Análisis (si hay aportaciones y datos)
+        if not df.empty and 'Aportación Extra' in df.columns and df['Aportación Extra'].sum() > 0:
+            ahorro_interes = calcular_ahorro_interes(df, tasa_interes)
+            meses_ahorrados = calcular_meses_ahorrados(df, plazo_original)
+            
+            analisis_df = pd.DataFrame({
+                'Métrica': [
+                    'Total Aportaciones Extra',
+                    'Meses con aportación extra',
+                    'Interés ahorrado estimado',
+                    'Plazo reducido',
+                    'Pago mensual promedio con aportaciones',
+                    'Pago mensual promedio sin aportaciones estimado'
+                ],
+                'Valor': [
+                    f"${df['Aportación Extra'].sum():,.2f}",
+                    f"{len(df[df['Aportación Extra'] > 0])} meses",
+                    f"${ahorro_interes:,.2f}",
+                    f"{meses_ahorrados} meses",
+                    f"${df['Pago Total'].mean():,.2f}",
+                    f"${(df['Pago Total'].sum() - df['Aportación Extra'].sum()) / len(df):,.2f}" if len(df) > 0 else "$0.00"
+                ]
+            })
+            analisis_df.to_excel(writer, sheet_name='Impacto Aportaciones', index=False)
+        
+        # Formatear hojas
+        if not df.empty:
+            worksheet1 = writer.sheets['Amortización']
+            for col in range(1, len(df.columns) + 1):
+                column_letter = chr(64 + col)
+                column = df.columns[col-1]
+                
+                # Encontrar ancho máximo
+                max_length = max(len(str(column)), df.iloc[:, col-1].astype(str).map(len).max())
+                adjusted_width = min(max_length + 2, 30)
+                worksheet1.column_dimensions[column_letter].width = adjusted_width
+                
+                # Formato de moneda para columnas numéricas (excepto Mes)
+                if col > 1:
+                    for row in range(2, len(df) + 2):
+                        cell = worksheet1.cell(row=row, column=col)
+                        cell.number_format = '$#,##0.00'
+    
+    output.seek(0)
+    return output
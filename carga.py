@@ -0,0 +1,174 @@
+"""
+Generador de carga para el servicio HTTP de tablas de amortización (servidor.py).
+
+Abre varias conexiones persistentes, envía solicitudes concurrentes con
+créditos aleatorios y reporta la latencia p50/p99 y las solicitudes por segundo.
+
+Uso:
+  python servidor.py --puerto 8000
+  python carga.py --puerto 8000 --ruta /resumen --solicitudes 2000 --concurrencia 32
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter
+
+def crear_credito(generador, plazo_meses):
+    """
+    Genera parámetros aleatorios para un crédito
+    """
+    precio_compra = generador.choice([100000.0, 500000.0, 1500000.0, 3000000.0])
+    credito = {
+        'precio_compra': precio_compra,
+        'enganche': round(precio_compra * generador.choice([0.1, 0.2, 0.3]), 2),
+        'tasa_interes_anual': generador.choice([8.5, 10.0, 12.0, 15.5]),
+        'plazo_meses': plazo_meses,
+        'tipo_amortizacion': generador.choice(["Francesa", "Alemana"])
+    }
+    if generador.random() < 0.5:
+        credito['aportacion_extra'] = generador.choice([500.0, 1000.0, 5000.0])
+        credito['inicio_aportacion'] = generador.randint(1, plazo_meses)
+    return credito
+
+def crear_cuerpos(solicitudes, lote, plazo_meses, semilla):
+    """
+    Prepara de antemano los cuerpos JSON de todas las solicitudes
+    """
+    generador = random.Random(semilla)
+    cuerpos = []
+    for _ in range(solicitudes):
+        if lote > 1:
+            datos = [crear_credito(generador, plazo_meses) for _ in range(lote)]
+        else:
+            datos = crear_credito(generador, plazo_meses)
+        cuerpos.append(json.dumps(datos).encode('utf-8'))
+    return cuerpos
+
+def percentil(valores_ordenados, porcentaje):
+    """
+    Percentil por rango más cercano de una lista ya ordenada
+    """
+    if not valores_ordenados:
+        return 0.0
+    posicion = max(1, math.ceil(porcentaje / 100 * len(valores_ordenados)))
+    return valores_ordenados[posicion - 1]
+
+async def enviar(reader, writer, host, ruta, cuerpo):
+    """
+    Envía una solicitud POST y devuelve el código de estado de la respuesta
+    """
+    solicitud = (
+        f"POST {ruta} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(cuerpo)}\r\n"
+        f"\r\n"
+    ).encode('latin-1') + cuerpo
+    writer.write(solicitud)
+    await writer.drain()
+
+    linea_estado = await reader.readline()
+    if not linea_estado:
+        raise ConnectionError("El servidor cerró la conexión")
+    estado = int(linea_estado.split()[1])
+
+    longitud = 0
+    while True:
+        linea = await reader.readline()
+        if linea in (b'\r\n', b'\n', b''):
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        if nombre.strip().lower() == 'content-length':
+            longitud = int(valor.strip())
+    await reader.readexactly(longitud)
+    return estado
+
+async def cliente(host, puerto, ruta, cuerpos, siguiente, latencias, errores):
+    """
+    Envía solicitudes por una conexión persistente hasta agotar la lista.
+    Sólo las respuestas 200 cuentan para la latencia; el resto se registra en errores
+    """
+    reader = writer = None
+    try:
+        while siguiente[0] < len(cuerpos):
+            cuerpo = cuerpos[siguiente[0]]
+            siguiente[0] += 1
+
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, puerto)
+                inicio = time.perf_counter()
+                estado = await enviar(reader, writer, host, ruta, cuerpo)
+            except (OSError, asyncio.IncompleteReadError):
+                # Conexión rechazada o cerrada: se reabre en la siguiente solicitud
+                errores.append('conexión')
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                continue
+
+            if estado == 200:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                errores.append(estado)
+    finally:
+        if writer is not None:
+            writer.close()
+
+async def ejecutar_carga(host, puerto, ruta, cuerpos, concurrencia):
+    """
+    Lanza los clientes concurrentes y devuelve latencias, errores y duración total
+    """
+    siguiente = [0]
+    latencias = []
+    errores = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        cliente(host, puerto, ruta, cuerpos, siguiente, latencias, errores)
+        for _ in range(concurrencia)
+    ))
+    return latencias, errores, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio de tablas de amortización")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección del servicio")
+    parser.add_argument("--puerto", type=int, default=8000, help="Puerto del servicio")
+    parser.add_argument("--ruta", default="/resumen", choices=["/tabla", "/resumen", "/excel"],
+                        help="Ruta a la que enviar las solicitudes")
+    parser.add_argument("--solicitudes", type=int, default=1000, help="Número total de solicitudes")
+    parser.add_argument("--concurrencia", type=int, default=16, help="Número de conexiones simultáneas")
+    parser.add_argument("--lote", type=int, default=1, help="Créditos por solicitud (1 = sin lote)")
+    parser.add_argument("--plazo", type=int, default=360, help="Plazo en meses de los créditos")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla para generar los créditos")
+    args = parser.parse_args()
+
+    if args.ruta == "/excel" and args.lote > 1:
+        parser.error("La ruta /excel no admite lotes")
+
+    cuerpos = crear_cuerpos(args.solicitudes, args.lote, args.plazo, args.semilla)
+    concurrencia = max(1, min(args.concurrencia, args.solicitudes))
+    latencias, errores, duracion = asyncio.run(
+        ejecutar_carga(args.host, args.puerto, args.ruta, cuerpos, concurrencia)
+    )
+
+    latencias.sort()
+    correctas = len(latencias)
+    print(f"Ruta:                {args.ruta}")
+    print(f"Solicitudes:         {correctas} correctas (200), {len(errores)} con error")
+    for causa, cantidad in sorted(Counter(errores).items(), key=str):
+        print(f"  Error {causa}: {cantidad}")
+    print(f"Créditos por lote:   {args.lote}")
+    print(f"Concurrencia:        {concurrencia}")
+    print(f"Duración:            {duracion:.2f} s")
+    print(f"Solicitudes/s:       {correctas / duracion:,.1f}" if duracion > 0 else "Solicitudes/s:       -")
+    print(f"Créditos/s:          {correctas * args.lote / duracion:,.1f}" if duracion > 0 else "Créditos/s:          -")
+    print(f"Latencia p50:        {percentil(latencias, 50) * 1000:.2f} ms")
+    print(f"Latencia p99:        {percentil(latencias, 99) * 1000:.2f} ms")
+    print(f"Latencia máxima:     {(latencias[-1] if latencias else 0.0) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Servicio HTTP local que expone el generador de tablas de amortización en JSON.
+
+Rutas:
+  GET  /salud    Estado del servicio
+  POST /tabla    Tabla de amortización completa
+  POST /resumen  Métricas del crédito (totales, plazo real, meses ahorrados)
+  POST /excel    Archivo Excel con la tabla, el resumen y el análisis de aportaciones
+
+El cuerpo de /tabla y /resumen puede ser un objeto con los parámetros de
+generar_tabla_amortizacion o una lista de objetos para calcular varios
+créditos en una sola solicitud. Las conexiones se atienden con asyncio y los
+cálculos se ejecutan en un grupo de procesos.
+
+Uso:
+  python servidor.py --puerto 8000 --procesos 4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from calculos import (
+    generar_tabla_amortizacion, generar_tabla_compacta, calcular_metricas,
+    calcular_meses_ahorrados, calcular_ahorro_interes, crear_excel_descargable
+)
+
+logger = logging.getLogger("servidor")
+
+PARAMETROS_OBLIGATORIOS = ('precio_compra', 'enganche', 'tasa_interes_anual', 'plazo_meses')
+PARAMETROS_OPCIONALES = ('aportacion_extra', 'inicio_aportacion', 'tipo_amortizacion',
+                         'tipo_aportacion', 'meses_aportacion')
+TIPOS_AMORTIZACION = ("Francesa", "Alemana")
+TIPOS_APORTACION = ("Mensual hasta el final", "Única", "Por número limitado de meses")
+
+# Límites para proteger al servicio de solicitudes desproporcionadas
+PLAZO_MAXIMO = 1200
+MONTO_MAXIMO = 1e12
+TASA_MAXIMA = 1000
+TAMANO_MAXIMO_LOTE = 1000
+TAMANO_MAXIMO_CUERPO = 4 * 1024 * 1024
+
+MENSAJES_HTTP = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error"
+}
+
+TIPO_JSON = "application/json; charset=utf-8"
+TIPO_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def es_numero(valor):
+    """
+    Indica si un valor JSON es un número finito (los booleanos, NaN e
+    Infinity no cuentan)
+    """
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return False
+    try:
+        return math.isfinite(valor)
+    except OverflowError:
+        # Enteros demasiado grandes para representarse como float
+        return False
+
+def es_entero(valor):
+    """
+    Indica si un valor JSON es un número entero
+    """
+    return es_numero(valor) and float(valor).is_integer()
+
+def validar_parametros(datos):
+    """
+    Valida los parámetros de un crédito y devuelve los argumentos para
+    generar_tabla_amortizacion. Lanza ValueError si algún dato es inválido
+    """
+    if not isinstance(datos, dict):
+        raise ValueError("Los parámetros del crédito deben ser un objeto JSON")
+
+    desconocidos = set(datos) - set(PARAMETROS_OBLIGATORIOS) - set(PARAMETROS_OPCIONALES)
+    if desconocidos:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+
+    faltantes = [clave for clave in PARAMETROS_OBLIGATORIOS if clave not in datos]
+    if faltantes:
+        raise ValueError(f"Faltan parámetros obligatorios: {', '.join(faltantes)}")
+
+    for clave in ('precio_compra', 'enganche', 'tasa_interes_anual', 'aportacion_extra'):
+        if clave in datos and (not es_numero(datos[clave]) or datos[clave] < 0):
+            raise ValueError(f"'{clave}' debe ser un número finito mayor o igual a 0")
+
+    # Con estos topes ningún cálculo se desborda a inf o NaN
+    for clave in ('precio_compra', 'enganche', 'aportacion_extra'):
+        if datos.get(clave, 0) > MONTO_MAXIMO:
+            raise ValueError(f"'{clave}' no puede ser mayor a ${MONTO_MAXIMO:,.0f}")
+    if datos['tasa_interes_anual'] > TASA_MAXIMA:
+        raise ValueError(f"'tasa_interes_anual' no puede ser mayor a {TASA_MAXIMA}%")
+
+    if not es_entero(datos['plazo_meses']) or not 1 <= datos['plazo_meses'] <= PLAZO_MAXIMO:
+        raise ValueError(f"'plazo_meses' debe ser un entero entre 1 y {PLAZO_MAXIMO}")
+
+    if datos['precio_compra'] - datos['enganche'] <= 0:
+        raise ValueError("El monto del préstamo debe ser mayor a $0.00")
+
+    for clave in ('inicio_aportacion', 'meses_aportacion'):
+        if datos.get(clave) is not None and (not es_entero(datos[clave]) or datos[clave] < 1):
+            raise ValueError(f"'{clave}' debe ser un entero mayor o igual a 1")
+
+    tipo_amortizacion = datos.get('tipo_amortizacion', "Francesa")
+    if tipo_amortizacion not in TIPOS_AMORTIZACION:
+        raise ValueError(f"'tipo_amortizacion' debe ser uno de: {', '.join(TIPOS_AMORTIZACION)}")
+
+    tipo_aportacion = datos.get('tipo_aportacion', "Mensual hasta el final")
+    if tipo_aportacion not in TIPOS_APORTACION:
+        raise ValueError(f"'tipo_aportacion' debe ser uno de: {', '.join(TIPOS_APORTACION)}")
+
+    if tipo_aportacion == "Por número limitado de meses" and datos.get('meses_aportacion') is None:
+        raise ValueError("'meses_aportacion' es obligatorio para aportaciones por número limitado de meses")
+
+    parametros = dict(datos)
+    parametros['plazo_meses'] = int(datos['plazo_meses'])
+    for clave in ('inicio_aportacion', 'meses_aportacion'):
+        if parametros.get(clave) is not None:
+            parametros[clave] = int(parametros[clave])
+    return parametros
+
+def calcular_tabla(parametros):
+    """
+    Genera la tabla de amortización como lista de filas
+    """
+    df, prestamo = generar_tabla_amortizacion(**parametros)
+    return {'prestamo': prestamo, 'tabla': df.to_dict(orient='records')}
+
+def calcular_resumen(parametros):
+    """
+    Genera las métricas del crédito sin devolver la tabla completa
+    """
+    tabla, prestamo = generar_tabla_compacta(**parametros)
+    resumen = {'prestamo': prestamo}
+    for clave, valor in calcular_metricas(tabla).items():
+        resumen[clave] = int(valor) if clave == 'plazo_real' else float(valor)
+    resumen['meses_ahorrados'] = calcular_meses_ahorrados(tabla, parametros['plazo_meses'])
+    resumen['interes_ahorrado_estimado'] = float(calcular_ahorro_interes(tabla, parametros['tasa_interes_anual']))
+    return resumen
+
+def calcular_excel(parametros):
+    """
+    Genera el archivo Excel descargable y devuelve su contenido en bytes
+    """
+    tabla, prestamo = generar_tabla_compacta(**parametros)
+    df = tabla.a_dataframe()
+    metricas = calcular_metricas(tabla)
+    plazo_meses = parametros['plazo_meses']
+    tasa_interes = parametros['tasa_interes_anual']
+    aportacion_extra = parametros.get('aportacion_extra', 0)
+    tipo_aportacion = parametros.get('tipo_aportacion', "Mensual hasta el final") if aportacion_extra > 0 else "No aplica"
+
+    resumen_datos = {
+        'Precio de Compra': f"${parametros['precio_compra']:,.2f}",
+        'Enganche': f"${parametros['enganche']:,.2f}",
+        'Préstamo': f"${prestamo:,.2f}",
+        'Tasa de Interés Anual': f"{tasa_interes}%",
+        'Plazo Solicitado': f"{plazo_meses} meses",
+        'Plazo Real': f"{metricas['plazo_real']} meses",
+        'Meses Ahorrados': f"{calcular_meses_ahorrados(df, plazo_meses)} meses",
+        'Tipo de Amortización': parametros.get('tipo_amortizacion', "Francesa"),
+        'Aportación Extra Mensual': f"${aportacion_extra:,.2f}",
+        'Tipo de Aportación': tipo_aportacion,
+        'Total Intereses': f"${metricas['total_interes']:,.2f}",
+        'Total Capital': f"${metricas['total_capital']:,.2f}",
+        'Total Aportaciones': f"${metricas['total_aportaciones']:,.2f}",
+        'Total a Pagar': f"${metricas['total_pagado']:,.2f}",
+        'Pago Promedio Mensual': f"${metricas['pago_promedio']:,.2f}",
+        'Fecha de Cálculo': datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    }
+
+    excel_file = crear_excel_descargable(df, resumen_datos, tipo_aportacion, tasa_interes, plazo_meses)
+    return excel_file.getvalue()
+
+def procesar_bloque(funcion, lista_parametros):
+    """
+    Aplica un cálculo a varios créditos dentro del mismo proceso. Los resultados
+    que no son bytes se codifican aquí en JSON para no ocupar el loop de asyncio
+    """
+    resultados = []
+    for parametros in lista_parametros:
+        resultado = funcion(parametros)
+        if not isinstance(resultado, bytes):
+            resultado = json.dumps(resultado, ensure_ascii=False, allow_nan=False).encode('utf-8')
+        resultados.append(resultado)
+    return resultados
+
+# Cálculo que corresponde a cada ruta POST
+RUTAS = {
+    '/tabla': calcular_tabla,
+    '/resumen': calcular_resumen,
+    '/excel': calcular_excel
+}
+
+def respuesta_json(estado, datos):
+    """
+    Construye una respuesta JSON como (estado, tipo de contenido, cuerpo)
+    """
+    return estado, TIPO_JSON, json.dumps(datos, ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+def respuesta_error(estado, mensaje):
+    """
+    Construye una respuesta de error en JSON
+    """
+    return respuesta_json(estado, {'error': mensaje})
+
+class ServicioAmortizacion:
+    """
+    Atiende las conexiones HTTP y reparte los cálculos en el grupo de procesos
+    """
+
+    def __init__(self, grupo_procesos, procesos):
+        self.grupo_procesos = grupo_procesos
+        self.procesos = procesos
+
+    async def ejecutar(self, funcion, lista_parametros):
+        """
+        Divide la lista de créditos en bloques, uno por proceso, y los calcula en paralelo
+        """
+        loop = asyncio.get_running_loop()
+        tamano_bloque = max(1, -(-len(lista_parametros) // self.procesos))
+        bloques = [lista_parametros[i:i + tamano_bloque]
+                   for i in range(0, len(lista_parametros), tamano_bloque)]
+        resultados = await asyncio.gather(*(
+            loop.run_in_executor(self.grupo_procesos, procesar_bloque, funcion, bloque)
+            for bloque in bloques
+        ))
+        return [resultado for bloque in resultados for resultado in bloque]
+
+    async def despachar(self, metodo, ruta, cuerpo):
+        """
+        Resuelve una solicitud y devuelve (estado, tipo de contenido, cuerpo)
+        """
+        if ruta == '/salud':
+            if metodo != 'GET':
+                return respuesta_error(405, "Método no permitido")
+            return respuesta_json(200, {'estado': 'ok', 'procesos': self.procesos})
+
+        if ruta not in RUTAS:
+            return respuesta_error(404, f"Ruta no encontrada: {ruta}")
+        if metodo != 'POST':
+            return respuesta_error(405, "Método no permitido")
+
+        try:
+            datos = json.loads(cuerpo)
+        except ValueError:
+            return respuesta_error(400, "El cuerpo de la solicitud no es JSON válido")
+
+        es_lote = isinstance(datos, list)
+        if es_lote:
+            if ruta == '/excel':
+                return respuesta_error(400, "La ruta /excel no admite lotes")
+            if not datos:
+                return respuesta_json(200, [])
+            if len(datos) > TAMANO_MAXIMO_LOTE:
+                return respuesta_error(413, f"El lote no puede tener más de {TAMANO_MAXIMO_LOTE} créditos")
+
+        lista_datos = datos if es_lote else [datos]
+        lista_parametros = []
+        for indice, elemento in enumerate(lista_datos):
+            try:
+                lista_parametros.append(validar_parametros(elemento))
+            except ValueError as error:
+                mensaje = f"Crédito {indice}: {error}" if es_lote else str(error)
+                return respuesta_error(400, mensaje)
+
+        try:
+            resultados = await self.ejecutar(RUTAS[ruta], lista_parametros)
+        except Exception:
+            logger.exception("Error al calcular %s", ruta)
+            return respuesta_error(500, "Error interno al generar la tabla de amortización")
+
+        if ruta == '/excel':
+            return 200, TIPO_EXCEL, resultados[0]
+        if es_lote:
+            return 200, TIPO_JSON, b'[' + b', '.join(resultados) + b']'
+        return 200, TIPO_JSON, resultados[0]
+
+    async def atender(self, reader, writer):
+        """
+        Atiende una conexión HTTP/1.1, con soporte para conexiones persistentes
+        """
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+
+                partes = linea.decode('latin-1').split()
+                encabezados = {}
+                while True:
+                    linea_encabezado = await reader.readline()
+                    if linea_encabezado in (b'\r\n', b'\n', b''):
+                        break
+                    nombre, _, valor = linea_encabezado.decode('latin-1').partition(':')
+                    encabezados[nombre.strip().lower()] = valor.strip()
+
+                if len(partes) != 3:
+                    await self.responder(writer, *respuesta_error(400, "Solicitud HTTP inválida"), False)
+                    break
+                metodo, ruta, version = partes
+                ruta = ruta.split('?', 1)[0]
+
+                try:
+                    longitud = int(encabezados.get('content-length', '0'))
+                except ValueError:
+                    longitud = -1
+                if longitud < 0:
+                    await self.responder(writer, *respuesta_error(400, "Content-Length inválido"), False)
+                    break
+                if longitud > TAMANO_MAXIMO_CUERPO:
+                    await self.responder(writer, *respuesta_error(413, "El cuerpo de la solicitud es demasiado grande"), False)
+                    break
+                cuerpo = await reader.readexactly(longitud) if longitud else b''
+
+                conexion = encabezados.get('connection', '').lower()
+                mantener = conexion == 'keep-alive' if version == 'HTTP/1.0' else conexion != 'close'
+
+                estado, tipo, contenido = await self.despachar(metodo, ruta, cuerpo)
+                await self.responder(writer, estado, tipo, contenido, mantener)
+                if not mantener:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # El cliente cerró la conexión o envió una línea demasiado larga
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def responder(self, writer, estado, tipo, contenido, mantener):
+        """
+        Escribe una respuesta HTTP completa en la conexión
+        """
+        encabezados = [
+            f"HTTP/1.1 {estado} {MENSAJES_HTTP[estado]}",
+            f"Content-Type: {tipo}",
+            f"Content-Length: {len(contenido)}",
+            f"Connection: {'keep-alive' if mantener else 'close'}"
+        ]
+        if tipo == TIPO_EXCEL:
+            nombre_archivo = f"tabla_amortizacion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            encabezados.append(f'Content-Disposition: attachment; filename="{nombre_archivo}"')
+        writer.write(("\r\n".join(encabezados) + "\r\n\r\n").encode('latin-1') + contenido)
+        await writer.drain()
+
+async def servir(host, puerto, procesos):
+    """
+    Inicia el servicio y lo mantiene en ejecución
+    """
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=procesos) as grupo_procesos:
+        # Arrancar los procesos antes de abrir el puerto para que no hereden el socket
+        await loop.run_in_executor(grupo_procesos, os.getpid)
+
+        servicio = ServicioAmortizacion(grupo_procesos, procesos)
+        servidor = await asyncio.start_server(servicio.atender, host, puerto)
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(senal, servidor.close)
+            except NotImplementedError:
+                # Windows no admite manejadores de señales en el loop
+                pass
+
+        logger.info("Servicio escuchando en http://%s:%s con %s procesos", host, puerto, procesos)
+        async with servidor:
+            try:
+                await servidor.serve_forever()
+            except asyncio.CancelledError:
+                logger.info("Servicio detenido")
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP de tablas de amortización")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección en la que escuchar")
+    parser.add_argument("--puerto", type=int, default=8000, help="Puerto en el que escuchar")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1,
+                        help="Número de procesos para los cálculos")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(servir(args.host, args.puerto, max(1, args.procesos)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculos import (
+    TIPOS_ALMACENAMIENTO, actualizar_tabla_amortizacion, calcular_metricas,
+    generar_tabla_amortizacion, generar_tabla_compacta, primer_mes_modificado
+)
+
+TIPOS_APORTACION = ("Mensual hasta el final", "Única", "Por número limitado de meses")
+
+def parametros_aportacion(generador, plazo_meses):
+    tipo_aportacion = generador.choice(TIPOS_APORTACION)
+    return {
+        'aportacion_extra': generador.choice([0, 500.0, 1234.56, 5000.0]),
+        'inicio_aportacion': generador.randint(1, plazo_meses),
+        'tipo_aportacion': tipo_aportacion,
+        'meses_aportacion': generador.randint(1, 24) if tipo_aportacion != "Mensual hasta el final" else None
+    }
+
+def credito_aleatorio(generador):
+    plazo_meses = generador.choice([12, 60, 360])
+    return {
+        'precio_compra': generador.choice([100000.0, 750000.0, 3000000.0]),
+        'enganche': 20000.0,
+        'tasa_interes_anual': generador.choice([0.0, 9.75, 12.0]),
+        'plazo_meses': plazo_meses,
+        'tipo_amortizacion': generador.choice(["Francesa", "Alemana"])
+    }
+
+def test_primer_mes_modificado():
+    credito = {'precio_compra': 100000.0, 'enganche': 20000.0, 'tasa_interes_anual': 12.0,
+               'plazo_meses': 36, 'tipo_amortizacion': "Francesa"}
+    unica = {'aportacion_extra': 1000.0, 'inicio_aportacion': 10,
+             'tipo_aportacion': "Única", 'meses_aportacion': None}
+
+    assert primer_mes_modificado({**credito, **unica}, {**credito, **unica}) == 37
+    assert primer_mes_modificado({**credito, **unica}, {**credito, **unica, 'inicio_aportacion': 12}) == 10
+    assert primer_mes_modificado({**credito, **unica, 'inicio_aportacion': 20},
+                                 {**credito, **unica, 'inicio_aportacion': 15}) == 15
+    # Un cambio en los datos del crédito obliga a recalcular desde el primer mes
+    assert primer_mes_modificado({**credito, **unica}, {**credito, **unica, 'tasa_interes_anual': 11.0}) == 1
+
+def test_actualizacion_incremental_igual_a_tabla_completa():
+    generador = random.Random(126)
+    for _ in range(20):
+        credito = credito_aleatorio(generador)
+        parametros = {**credito, **parametros_aportacion(generador, credito['plazo_meses'])}
+        tabla, _ = actualizar_tabla_amortizacion(None, None, parametros)
+
+        # Ediciones sucesivas de las aportaciones, como al moverlas en la aplicación
+        for _ in range(10):
+            nuevos = {**credito, **parametros_aportacion(generador, credito['plazo_meses'])}
+            tabla, prestamo = actualizar_tabla_amortizacion(tabla, parametros, nuevos)
+            parametros = nuevos
+
+            completa, prestamo_completo = generar_tabla_amortizacion(**nuevos)
+            assert prestamo == prestamo_completo
+            pd.testing.assert_frame_equal(tabla.a_dataframe(), completa)
+            assert calcular_metricas(tabla) == pytest.approx(calcular_metricas(completa))
+
+def test_actualizacion_incremental_conserva_los_meses_previos():
+    credito = {'precio_compra': 500000.0, 'enganche': 50000.0, 'tasa_interes_anual': 10.0,
+               'plazo_meses': 240, 'tipo_amortizacion': "Francesa"}
+    previos = {**credito, 'aportacion_extra': 0, 'inicio_aportacion': 1,
+               'tipo_aportacion': "Mensual hasta el final", 'meses_aportacion': None}
+    nuevos = {**previos, 'aportacion_extra': 3000.0, 'inicio_aportacion': 100}
+    tabla, _ = actualizar_tabla_amortizacion(None, None, previos)
+    prefijo = tabla.a_dataframe().iloc[:99].copy()
+    vista = tabla.columna('Interés')
+
+    actualizada, _ = actualizar_tabla_amortizacion(tabla, previos, nuevos)
+    assert actualizada is tabla
+    # Los meses anteriores al cambio se conservan en los mismos arreglos
+    assert np.shares_memory(actualizada.columna('Interés'), vista)
+    pd.testing.assert_frame_equal(actualizada.a_dataframe().iloc[:99], prefijo)
+    assert len(actualizada) < 240
+
+@pytest.mark.parametrize("tipo_almacenamiento", list(TIPOS_ALMACENAMIENTO))
+def test_actualizacion_incremental_igual_a_calculo_completo(tipo_almacenamiento):
+    generador = random.Random(26)
+    for _ in range(20):
+        plazo_meses = generador.choice([12, 60, 360])
+        credito = {
+            'precio_compra': generador.choice([100000.0, 750000.0, 3000000.0]),
+            'enganche': 20000.0,
+            'tasa_interes_anual': generador.choice([0.0, 9.75, 12.0]),
+            'plazo_meses': plazo_meses,
+            'tipo_amortizacion': generador.choice(["Francesa", "Alemana"])
+        }
+        parametros = {**credito, **parametros_aportacion(generador, plazo_meses)}
+        tabla, _ = generar_tabla_compacta(**parametros, tipo_almacenamiento=tipo_almacenamiento,
+                                          incremental=True)
+
+        # Ediciones sucesivas sobre la misma tabla, como en la aplicación
+        for _ in range(10):
+            nuevos = {**credito, **parametros_aportacion(generador, plazo_meses)}
+            tabla, _ = actualizar_tabla_amortizacion(tabla, parametros, nuevos)
+            parametros = nuevos
+
+            completa, _ = generar_tabla_compacta(**nuevos, tipo_almacenamiento=tipo_almacenamiento,
+                                                 incremental=True)
+            assert tabla.mes_liquidacion == completa.mes_liquidacion
+            assert tabla.metricas() == completa.metricas()
+            meses = len(completa)
+            np.testing.assert_array_equal(tabla.montos[:, :meses], completa.montos[:, :meses])
+            np.testing.assert_array_equal(tabla.acumulados[:, :meses], completa.acumulados[:, :meses])
+
+            # Sin los arreglos para reanudar, los montos guardados son los mismos
+            compacta, _ = generar_tabla_compacta(**nuevos, tipo_almacenamiento=tipo_almacenamiento)
+            assert compacta.metricas() == completa.metricas()
+            np.testing.assert_array_equal(compacta.montos, completa.montos[:, :meses])
+
+def test_acumulados_coinciden_con_suma_acumulada():
+    tabla, _ = generar_tabla_compacta(500000.0, 50000.0, 11.0, 240, aportacion_extra=2000.0,
+                                      inicio_aportacion=13)
+    df = tabla.a_dataframe(acumulados=True)
+    np.testing.assert_allclose(df['Interés Acumulado'], df['Interés'].cumsum())
+    np.testing.assert_allclose(df['Capital Acumulado'], df['Amortización'].cumsum())
+    assert tabla.metricas()['total_interes'] == df['Interés Acumulado'].iloc[-1]
+
+def test_columna_mes_es_int64():
+    df, _ = generar_tabla_amortizacion(100000.0, 20000.0, 12.0, 36)
+    assert df['Mes'].dtype == np.int64
+
+def test_memoria_por_tipo_de_almacenamiento():
+    credito = (1500000.0, 300000.0, 10.5, 360)
+    df, _ = generar_tabla_amortizacion(*credito)
+    memoria_dataframe = df.memory_usage(index=False).sum()
+    assert memoria_dataframe == 7 * 8 * 360
+
+    tablas = {tipo: generar_tabla_compacta(*credito, tipo_almacenamiento=tipo)[0]
+              for tipo in TIPOS_ALMACENAMIENTO}
+    # 'Mes' no se guarda: seis columnas de montos
+    assert tablas['float64'].nbytes == 6 * 8 * 360
+    assert tablas['float32'].nbytes == tablas['float64'].nbytes // 2
+    assert tablas['float32'].nbytes < memoria_dataframe / 2
+    # Los centavos caben en int32 para créditos de hasta ~21 millones
+    assert tablas['centavos'].montos.dtype == np.int32
+    assert tablas['centavos'].nbytes == tablas['float32'].nbytes
+
+    # Las tablas incrementales guardan además el saldo y los totales en float64
+    incremental, _ = generar_tabla_compacta(*credito, incremental=True)
+    assert incremental.nbytes == (6 + 4) * 8 * 360
+
+def test_tabla_se_recorta_al_liquidar():
+    tabla, _ = generar_tabla_compacta(500000.0, 50000.0, 11.0, 240, aportacion_extra=5000.0)
+    assert len(tabla) < 240
+    assert tabla.montos.shape == (6, len(tabla))
+    assert tabla.montos[0].flags['C_CONTIGUOUS']
+
+    # La tabla incremental conserva el plazo completo para poder reanudarse
+    incremental, _ = generar_tabla_compacta(500000.0, 50000.0, 11.0, 240, aportacion_extra=5000.0,
+                                            incremental=True)
+    assert incremental.montos.shape == (6, 240)
+    assert incremental.metricas() == tabla.metricas()
+
+def test_centavos_usa_int64_para_montos_grandes():
+    tabla, _ = generar_tabla_compacta(50000000.0, 5000000.0, 10.0, 240, tipo_almacenamiento='centavos')
+    assert tabla.montos.dtype == np.int64
+    df, _ = generar_tabla_amortizacion(50000000.0, 5000000.0, 10.0, 240)
+    np.testing.assert_allclose(tabla.columna('Saldo Inicial'), df['Saldo Inicial'], atol=0.005)
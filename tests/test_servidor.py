@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from carga import enviar, percentil
+from servidor import (
+    TAMANO_MAXIMO_LOTE, TIPO_EXCEL, TIPO_JSON, ServicioAmortizacion, validar_parametros
+)
+
+CREDITO = {'precio_compra': 100000.0, 'enganche': 20000.0, 'tasa_interes_anual': 12.0, 'plazo_meses': 36}
+
+def despachar(metodo, ruta, datos=None, cuerpo=None):
+    """
+    Ejecuta despachar con un grupo de hilos en lugar de procesos
+    """
+    if cuerpo is None:
+        cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else b''
+
+    async def ejecutar():
+        with ThreadPoolExecutor(max_workers=2) as grupo:
+            return await ServicioAmortizacion(grupo, 2).despachar(metodo, ruta, cuerpo)
+
+    return asyncio.run(ejecutar())
+
+def test_validar_parametros_acepta_credito_valido():
+    parametros = validar_parametros({**CREDITO, 'plazo_meses': 36.0, 'inicio_aportacion': 3.0})
+    assert parametros['plazo_meses'] == 36 and isinstance(parametros['plazo_meses'], int)
+    assert parametros['inicio_aportacion'] == 3 and isinstance(parametros['inicio_aportacion'], int)
+
+@pytest.mark.parametrize("datos, mensaje", [
+    ([CREDITO], "objeto JSON"),
+    ({**CREDITO, 'moneda': 'MXN'}, "desconocidos: moneda"),
+    ({'precio_compra': 100000.0, 'enganche': 0.0}, "obligatorios: tasa_interes_anual, plazo_meses"),
+    ({**CREDITO, 'precio_compra': float('nan')}, "'precio_compra' debe ser un número finito"),
+    ({**CREDITO, 'tasa_interes_anual': float('inf')}, "'tasa_interes_anual' debe ser un número finito"),
+    ({**CREDITO, 'aportacion_extra': float('-inf')}, "'aportacion_extra' debe ser un número finito"),
+    ({**CREDITO, 'enganche': True}, "'enganche' debe ser un número finito"),
+    ({**CREDITO, 'precio_compra': 10 ** 400}, "'precio_compra' debe ser un número finito"),
+    ({**CREDITO, 'precio_compra': 1e308, 'tasa_interes_anual': 1e308}, "'precio_compra' no puede ser mayor"),
+    ({**CREDITO, 'tasa_interes_anual': 1001}, "'tasa_interes_anual' no puede ser mayor"),
+    ({**CREDITO, 'plazo_meses': 12.5}, "'plazo_meses' debe ser un entero"),
+    ({**CREDITO, 'plazo_meses': True}, "'plazo_meses' debe ser un entero"),
+    ({**CREDITO, 'plazo_meses': 0}, "'plazo_meses' debe ser un entero"),
+    ({**CREDITO, 'enganche': 100000.0}, "mayor a $0.00"),
+    ({**CREDITO, 'inicio_aportacion': 0}, "'inicio_aportacion' debe ser un entero"),
+    ({**CREDITO, 'tipo_amortizacion': "Americana"}, "'tipo_amortizacion' debe ser uno de"),
+    ({**CREDITO, 'aportacion_extra': 500.0, 'tipo_aportacion': "Por número limitado de meses"},
+     "'meses_aportacion' es obligatorio"),
+])
+def test_validar_parametros_rechaza_datos_invalidos(datos, mensaje):
+    with pytest.raises(ValueError, match=mensaje.replace('$', r'\$')):
+        validar_parametros(datos)
+
+def test_despachar_tabla_y_resumen():
+    estado, tipo, cuerpo = despachar('POST', '/tabla', CREDITO)
+    assert (estado, tipo) == (200, TIPO_JSON)
+    tabla = json.loads(cuerpo)
+    assert tabla['prestamo'] == 80000.0
+    assert len(tabla['tabla']) == 36
+    assert tabla['tabla'][0]['Mes'] == 1
+
+    estado, _, cuerpo = despachar('POST', '/resumen', {**CREDITO, 'aportacion_extra': 500.0})
+    resumen = json.loads(cuerpo)
+    assert estado == 200
+    assert resumen['plazo_real'] < 36
+    assert resumen['meses_ahorrados'] == 36 - resumen['plazo_real']
+
+def test_despachar_lote_conserva_el_orden():
+    lote = [{**CREDITO, 'plazo_meses': plazo} for plazo in (12, 24, 36, 48, 60)]
+    estado, _, cuerpo = despachar('POST', '/resumen', lote)
+    assert estado == 200
+    assert [resumen['plazo_real'] for resumen in json.loads(cuerpo)] == [12, 24, 36, 48, 60]
+
+def test_despachar_lote_vacio():
+    assert despachar('POST', '/tabla', []) == (200, TIPO_JSON, b'[]')
+
+def test_despachar_lote_demasiado_grande():
+    estado, _, cuerpo = despachar('POST', '/resumen', [CREDITO] * (TAMANO_MAXIMO_LOTE + 1))
+    assert estado == 413
+    assert 'error' in json.loads(cuerpo)
+
+def test_despachar_lote_con_credito_invalido():
+    estado, _, cuerpo = despachar('POST', '/resumen', [CREDITO, {**CREDITO, 'plazo_meses': 0}])
+    assert estado == 400
+    assert json.loads(cuerpo)['error'].startswith("Crédito 1:")
+
+def test_despachar_excel():
+    estado, tipo, cuerpo = despachar('POST', '/excel', CREDITO)
+    assert (estado, tipo) == (200, TIPO_EXCEL)
+    assert cuerpo[:2] == b'PK'
+
+    estado, _, cuerpo = despachar('POST', '/excel', [CREDITO])
+    assert estado == 400
+    assert "no admite lotes" in json.loads(cuerpo)['error']
+
+def test_despachar_errores_de_ruta_y_metodo():
+    assert despachar('GET', '/salud')[0] == 200
+    assert despachar('POST', '/salud')[0] == 405
+    assert despachar('POST', '/nada', CREDITO)[0] == 404
+    assert despachar('GET', '/tabla')[0] == 405
+    assert despachar('POST', '/tabla', cuerpo=b'{"precio_compra": ')[0] == 400
+    assert despachar('POST', '/tabla', cuerpo=b'{"precio_compra": NaN}')[0] == 400
+
+def test_atender_conexion_persistente():
+    async def ida_y_vuelta():
+        with ProcessPoolExecutor(max_workers=1) as grupo:
+            # Como en servir: los procesos arrancan antes de abrir conexiones
+            await asyncio.get_running_loop().run_in_executor(grupo, os.getpid)
+            servicio = ServicioAmortizacion(grupo, 1)
+            servidor = await asyncio.start_server(servicio.atender, '127.0.0.1', 0)
+            puerto = servidor.sockets[0].getsockname()[1]
+            async with servidor:
+                reader, writer = await asyncio.open_connection('127.0.0.1', puerto)
+                cuerpo = json.dumps(CREDITO).encode('utf-8')
+                # Tres solicitudes por la misma conexión
+                estados = [
+                    await enviar(reader, writer, '127.0.0.1', '/resumen', cuerpo),
+                    await enviar(reader, writer, '127.0.0.1', '/nada', cuerpo),
+                    await enviar(reader, writer, '127.0.0.1', '/tabla', cuerpo)
+                ]
+
+                # Con Connection: close el servidor cierra tras responder
+                writer.write(b"GET /salud HTTP/1.1\r\nHost: prueba\r\nConnection: close\r\n\r\n")
+                respuesta = await asyncio.wait_for(reader.read(), timeout=10)
+                writer.close()
+        return estados, respuesta
+
+    estados, respuesta = asyncio.run(ida_y_vuelta())
+    assert estados == [200, 404, 200]
+    assert respuesta.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert b"Connection: close\r\n" in respuesta
+
+def test_percentil():
+    valores = list(range(1, 101))
+    assert percentil(valores, 50) == 50
+    assert percentil(valores, 99) == 99
+    assert percentil(valores, 100) == 100
+    assert percentil([7.5], 99) == 7.5
+    assert percentil([], 50) == 0.0